@@ -124,6 +124,9 @@ ACUTE_ACCENT_AFTER_VOWEL = re.compile(rf'([{VOWELS_WO_ACCENT}])([{ACUTE_ACCENTS}
 # Sequences of common punctuation
 PUNCTUATION_RE = re.compile(r'[-,.…;:!?"/()]+')
 
+# Whitespace sequences
+WHITESPACE_RE = re.compile(r'\s+')
+
 # Replacements needed to convert the internal form used for candidate word to the external form
 # used in the dictionary.
 EXPORT_REPL = {
@@ -155,7 +158,7 @@ class Conversion():
     penalty: bool  # Whether a penalty should be applied
 
 
-@dataclass
+@dataclass(slots=True)
 class Candidate():
     """A word in (nearly) our phonology considered a candidate for selection.
 
@@ -183,7 +186,8 @@ class Candidate():
     simscore: float = -1.0    # The similarity score, normalized from 0 (worst) to 1 (best)
     related_cands: Dict[str, List[Candidate]] = field(
         default_factory=lambda: defaultdict(list), compare=False)
-    filled = False      # set to True by insert_filler_vowels
+    # Set to True by insert_filler_vowels
+    filled: bool = field(default=False, init=False, repr=False, compare=False)
 
     @property
     def dscore(self) -> float:
@@ -794,7 +798,7 @@ def normalize_word(word: str) -> str:
     * Whitespace and hyphens (marking affixes and separating word parts) are deleted.
     """
     word = word.lower()
-    word = re.sub(r'\s+', '', word)
+    word = WHITESPACE_RE.sub('', word)
     if word.endswith('ng'):
         word = word[:-1]
     for key, value in NORM_REPL.items():
@@ -38,19 +38,22 @@ Requires Python 3.7+ and the editdistance library.
 # pylint: disable=too-many-lines
 
 import argparse
-from collections import defaultdict
+import bisect
+from collections import Counter, defaultdict, deque
 import csv
 from enum import Enum
 from datetime import datetime
 from functools import lru_cache, total_ordering
 import glob
-from itertools import cycle
+import heapq
+import io
+from itertools import pairwise
 from operator import itemgetter
 from os import path
 import re
 import sys
 import textwrap
-from typing import Counter, FrozenSet, List, Optional, Sequence, Set, Tuple
+from typing import FrozenSet, Iterator, List, Optional, Sequence, Set, Tuple
 
 import editdistance
 
@@ -83,6 +86,12 @@ TARGET_ENTRY_COUNT = 1000
 # pure adverbs are rare and may well be short)
 CONTENT_CLASSES = frozenset('adj name noun verb'.split())
 
+# Separators between the parts of a compound (whitespace or hyphen)
+COMPOUND_SEP_RE = re.compile(r'\s+|-')
+
+# Separators between the parts of a word considered when looking for derivatives
+WORD_PART_SEP_RE = re.compile(r'[ -]+')
+
 
 # Enum for grouping all words into three kinds
 @total_ordering
@@ -104,6 +113,52 @@ KIND_DESC = {
 }
 
 
+##### Functions for merging the fields of two entries #####
+
+def merge_classes(value: str, value_2: str) -> str:
+    """Merge two 'class' values.
+
+    Only the first class is kept if they are different, unless one of them is an affix --
+    then both are kept (comma-separated).
+    """
+    if value == value_2 or not (value.endswith('fix') or value_2.endswith('fix')):
+        return value
+    if ',' in value and value_2 in util.split_on_commas(value):
+        # The first is a list such as 'noun, suffix' which already contains the second value
+        return value
+    return value + ', ' + value_2
+
+
+def merge_senses(value: str, value_2: str) -> str:
+    """Merge two 'sense' values by separating them with a ' | '."""
+    return value + ' | ' + value_2
+
+
+def merge_transcounts(value: str, value_2: str) -> str:
+    """Merge two 'transcount' values by keeping the larger one."""
+    return str(max(int(value), int(value_2)))
+
+
+def merge_semicolon_lists(value: str, value_2: str) -> str:
+    """Merge two semicolon-separated lists, such as translations.
+
+    The first value is kept as is, the words of the second one which aren't yet part of it are
+    appended (in order and without duplicates).
+    """
+    words = set(util.split_on_semicolons(value))
+    return '; '.join([value] + [word for word in dict.fromkeys(util.split_on_semicolons(value_2))
+                                if word not in words])
+
+
+# The functions used by 'do_merge_entries' to merge the values of specific fields – all other
+# fields are merged by 'merge_semicolon_lists'
+MERGE_FUNCTIONS = {
+    'class': merge_classes,
+    'sense': merge_senses,
+    'transcount': merge_transcounts,
+}
+
+
 ##### Main class #####
 
 class VocBuilder:
@@ -133,17 +188,19 @@ class VocBuilder:
         # Sets used for the polysemy check
         self.polyseme_dict: dict[str, Set[str]] = self.fill_polyseme_dict(self.existing_entries)
         self.langcode_sets: dict[str, Set[str]] = self.fill_langcode_sets(self.existing_entries)
+        self.polyseme_langs = self.find_polyseme_langs(self.polyseme_dict)
 
-        # Mapping from existing words (converted to lower-case) to their classes
-        existing_words_dict: dict[str, Set[str]] = defaultdict(set)
+        # Mapping from existing words (converted to lower-case and interned) to their classes
+        existing_words_dict: dict[str, FrozenSet[str]] = {}
         # Just the words, normalized to avoid minimal pairs and with affix hyphens removed
         existing_norm_words: Set[str] = set()
 
         for entry in self.existing_entries:
             wordlist = entry.get('word', '')
-            classes = set(util.split_on_commas(entry.get('class', '')))
+            classes = frozenset(util.split_on_commas(entry.get('class', '')))
             for word in util.split_on_semicolons(wordlist):
-                existing_words_dict[word.lower()] |= classes
+                key = sys.intern(word.lower())
+                existing_words_dict[key] = existing_words_dict.get(key, frozenset()) | classes
                 existing_norm_words.add(bu.normalize_word(word))
 
         self.existing_words_dict = existing_words_dict
@@ -186,6 +243,19 @@ class VocBuilder:
         self.auxlangs: List[str] = []
         self.preferred_cand = -1
 
+        # Additional languages requested by the --consider option, and the message announcing
+        # them (both derived just once since candidates are built for each entry)
+        self._extra_lang_codes = util.split_on_commas(self.args.consider)
+        self._consider_msg = (f'Also considering candidates from '
+                              f'{", ".join(self._extra_lang_codes)} as requested.')
+
+        # Keys of termdict entries skipped because they exist already in our dictionary
+        self.skipped_entry_keys: Set[str] = set()
+
+        # Index used by find_entry, and the entry map from which it was built
+        self._entry_index: dict[Tuple[str, Optional[str]], List[LineDict]] = {}
+        self._entry_index_map: Optional[dict[int, List[LineDict]]] = None
+
         # Set of currently active fallback languages
         self._active_fallbacks: set[str] = set()
 
@@ -255,8 +325,8 @@ class VocBuilder:
 
         # Set of all typical source languages, including fallback languages and those
         # auxlangs used by default
-        self._full_sourcelang_set = (set(sourcelang_list) | set(fallback_to_main)
-                                     | util.DEFAULT_AUXLANGS)
+        self._full_sourcelang_set = frozenset(set(sourcelang_list) | set(fallback_to_main)
+                                              | util.DEFAULT_AUXLANGS)
 
     @staticmethod
     def get_kind(entry: LineDict) -> Kind:
@@ -270,11 +340,24 @@ class VocBuilder:
         If a word belongs to several classes, only its first kind will be returned. So,
         "verb, noun" will be treated as Kind.VERB.
         """
-        classes = util.split_on_commas(entry.get('class', ''))
-        if not classes:
+        kind = VocBuilder.kind_of_class(entry.get('class', ''))
+        if kind is None:
             word = entry.get('word', '')
             LOG.warn(f'Entry {word} lacks a class (treating as noun)')
             return Kind.NOUN
+        return kind
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def kind_of_class(cls: str) -> Optional[Kind]:
+        """Convert the value of the 'class' field of an entry into a kind.
+
+        See 'get_kind' for details. Returns None if 'cls' is empty. Since there are just a
+        few distinct class values, results are cached.
+        """
+        classes = util.split_on_commas(cls)
+        if not classes:
+            return None
 
         first_class = classes[0]
         if first_class in ('noun', 'name'):
@@ -285,13 +368,9 @@ class VocBuilder:
 
     def count_existing_kinds(self, entries: Sequence[LineDict]) -> dict[Kind, int]:
         """Count the existing distribution of kinds of words in our dictionary."""
-        # We cannot use Python's counter class here, since 0 counts matter as well
-        counter: dict[Kind, int] = {}
-        for kind in KIND_DESC:
-            counter[kind] = 0
-        for entry in entries:
-            counter[self.get_kind(entry)] += 1
-        return counter
+        counter = Counter(map(self.get_kind, entries))
+        # Kinds that don't occur at all must be returned as well, with a count of 0
+        return {kind: counter[kind] for kind in KIND_DESC}
 
     def determine_kinds_to_add(self, entries: Sequence[LineDict]) -> FrozenSet[Kind]:
         """Determine the kinds of word to be added next.
@@ -368,6 +447,14 @@ class VocBuilder:
                     result[full_trans.lower()].add(word)
         return result
 
+    @staticmethod
+    def find_polyseme_langs(polyseme_dict: dict[str, Set[str]]) -> FrozenSet[str]:
+        """Return the language codes used in the keys of the polyseme dictionary.
+
+        Translations into other languages can never match, so the polysemy check skips them.
+        """
+        return frozenset(key.split(':', 1)[0] for key in polyseme_dict)
+
     @staticmethod
     def fill_langcode_sets(entries: Sequence[LineDict]) -> dict[str, Set[str]]:
         """Initialize a set of language codes giving the translations of each word.
@@ -513,6 +600,7 @@ class VocBuilder:
             # (but remember the key to avoid spurious warnings about unused extradict entries)
             if filter_out_existing and (entry_key in existing_entry_dict):
                 extra_keys_seen.add(entry_key)
+                self.skipped_entry_keys.add(entry_key)
                 continue
 
             # Merge with extra entry, if any
@@ -539,6 +627,23 @@ class VocBuilder:
 
         return count_map
 
+    @staticmethod
+    def counts_descending(count_map: dict[int, List[LineDict]]) -> Iterator[int]:
+        """Yield the translation counts used as keys of 'count_map', highest first.
+
+        Callers usually stop after the first count or a few, so the highest one is simply
+        found with 'max', while the others are popped from a heap one at a time rather than
+        sorted all at once.
+        """
+        if not count_map:
+            return
+        max_count = max(count_map)
+        yield max_count
+        heap = [-count for count in count_map if count != max_count]
+        heapq.heapify(heap)
+        while heap:
+            yield -heapq.heappop(heap)
+
     def preprocess_candidate_word(self, word: str, conv_dict_name: str, cls: str) -> str:
         """Do some language-specific preprocessing on a candidate word."""
         # pylint: disable=too-many-branches, too-many-statements
@@ -1209,6 +1314,7 @@ class VocBuilder:
         return 3 if first_class in CONTENT_CLASSES else 1
 
     @staticmethod
+    @lru_cache(maxsize=4096)
     def cleanup_translation_value(value: str) -> str:
         """Cleanup the translations of a concept in some language for export.
 
@@ -1313,6 +1419,17 @@ class VocBuilder:
         else:
             entry.add(key, value)
 
+    @staticmethod
+    def dict_sort_key(entry: LineDict) -> Tuple[str, str, str, str]:
+        """Return the key used to sort the entries of our dictionary.
+
+        We sort first by the word itself, then by the word class, finally by the English
+        translation. If two words differ only by case, the capitalized one will be put first
+        ('Jungvo' precedes 'jungvo').
+        """
+        word = entry.get('word', '')
+        return (word.lower(), word, entry.get('class', '').lower(), entry.get('en', '').lower())
+
     def add_entries_to_dict(self, entries: List[LineDict], export_needed: bool = True) -> None:
         """Add the selected candidate entries to the output dictionary and write them to disk.
 
@@ -1323,32 +1440,45 @@ class VocBuilder:
         ensure that fields are serialized in the correct order and that inappropriate fields
         are skipped. Set this to False if existing entries were modified in-place, so no
         re-export is needed.
+
+        The other existing entries are written just as they were read from the dictionary
+        file, since they are already in exported form.
         """
         # pylint: disable=too-many-branches, too-many-locals
+        args = self.args
+        merged_words = self.merged_words
+
         if export_needed:
             out_entries = [self.export_entry(entry) for entry in entries]
         else:
             out_entries = entries
 
-        if self.merged_words:
+        if merged_words:
             # Some of the existing entry must be skipped since they have been revised
-            existing_entries = []
-            for existing_entry in self.existing_entries:
-                if existing_entry.get('word', '') not in self.merged_words:
-                    existing_entries.append(existing_entry)
+            existing_entries = [existing_entry for existing_entry in self.existing_entries
+                                if existing_entry.get('word', '') not in merged_words]
         else:
             existing_entries = list(self.existing_entries)
 
+        # Remember the number of new entries, since 'out_entries' may be the same list as
+        # 'entries' and grows by the existing ones
+        new_count = len(entries)
         out_entries += existing_entries
 
-        # We sort first by the word itself, then by the word class, finally by the English
-        # translation. If two words differ only by case, the capitalized one will be put first
-        # ('Jungvo' precedes 'jungvo').
-        sorted_entries = sorted(out_entries,
-                                key=lambda entry: (entry.get('word', '').lower(),
-                                                   entry.get('word'),
-                                                   entry.get('class', '').lower(),
-                                                   entry.get('en', '').lower()))
+        existing_keys = []
+        if new_count <= 1 and not merged_words:
+            existing_keys = [self.dict_sort_key(entry) for entry in existing_entries]
+
+        if existing_keys and all(key1 <= key2 for key1, key2 in pairwise(existing_keys)):
+            # The existing entries are still in the order in which we wrote them, so it's
+            # sufficient to insert the new entry (if any) at its proper place. If dict.txt was
+            # edited by hand and is no longer sorted, all entries are sorted instead
+            sorted_entries = existing_entries
+            for out_entry in out_entries[:new_count]:
+                index = bisect.bisect_left(existing_keys, self.dict_sort_key(out_entry))
+                sorted_entries.insert(index, out_entry)
+        else:
+            sorted_entries = sorted(out_entries, key=self.dict_sort_key)
 
         # Add the words to the dictionary
         util.rename_to_backup(DICT_FILE)
@@ -1356,101 +1486,65 @@ class VocBuilder:
 
         # Also append new rows to the CSV file – unless an option was used which means that
         # we have to (potentially) modify or delete some existing entries instead of adding a
-        # one
-        util.copy_to_backup(DICT_CSV)
-        first_entry = out_entries[0] if entries else None
-
-        if (self.args.addmeaning or self.args.addenglish or self.args.addkomusan) and first_entry:
-            with open(DICT_CSV, newline='', encoding='utf8') as csvfile:
-                reader = csv.reader(csvfile)
-                lines = list(reader)
-
-                if self.args.addkomusan:
-                    # The Komusan word has changed
-                    old_word = self.old_word
-                    new_word = first_entry.get('word', '')
-                    en_word = first_entry.get('en', '')
-
-                    for idx, line in enumerate(lines):
-                        if line[1] == old_word:
-                            lines[idx] = [en_word, new_word]
-                            break
-                    else:
-                        LOG.warn(f'Entry "{old_word}" not found in {DICT_CSV}')
+        # one. The backup copy is made from the same read that gives us the current contents,
+        # so the file needn't be opened a second time.
+        csv_text = util.copy_to_backup_and_read(DICT_CSV)
+        first_entry = out_entries[0] if new_count else None
+        # Set to the complete list of rows if the file must be rewritten rather than appended to
+        new_lines: Optional[List[List[str]]] = None
+
+        if (args.addmeaning or args.addenglish or args.addkomusan) and first_entry:
+            new_lines = list(csv.reader(io.StringIO(csv_text)))
+            en_word = first_entry.get('en', '')
+            our_word = first_entry.get('word', '')
+
+            # The Komusan word has changed if added, so we have to look for the old one
+            search_word = self.old_word if args.addkomusan else our_word
+
+            for idx, line in enumerate(new_lines):
+                if line[1] == search_word:
+                    new_lines[idx] = [en_word, our_word]
+                    break
+            else:
+                # Only format the warning if it's actually needed
+                if args.addkomusan:
+                    LOG.warn(f'Entry "{search_word}" not found in {DICT_CSV}')
                 else:
-                    en_word = first_entry.get('en', '')
-                    our_word = first_entry.get('word', '')
+                    LOG.warn(f'Entry "{en_word}" – "{our_word}" not found in {DICT_CSV}')
 
-                    for idx, line in enumerate(lines):
-                        if line[1] == our_word:
-                            lines[idx] = [en_word, our_word]
-                            break
-                    else:
-                        LOG.warn(f'Entry "{en_word}" – "{our_word}" not found in {DICT_CSV}')
-
-            # Reopen file for writing
-            with open(DICT_CSV, 'w', newline='', encoding='utf8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerows(lines)
-
-        elif self.args.delete or self.args.delete_only:
-            words_to_keep = set()
-            for out_entry in out_entries:
-                words_to_keep.add(out_entry.get('word', ''))
-            with open(DICT_CSV, newline='', encoding='utf8') as csvfile:
-                reader = csv.reader(csvfile)
-                lines = list(reader)
-                lines_to_keep = []
-
-                for line in lines:
-                    if line[1] in words_to_keep:
-                        lines_to_keep.append(line)
-
-            # Reopen file for writing
-            with open(DICT_CSV, 'w', newline='', encoding='utf8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerows(lines_to_keep)
+        elif args.delete or args.delete_only:
+            words_to_keep = {out_entry.get('word', '') for out_entry in out_entries}
+            new_lines = [line for line in csv.reader(io.StringIO(csv_text))
+                         if line[1] in words_to_keep]
 
-        elif self.merged_words:
+        elif merged_words:
             # Some existing words may have acquired additional English meanings, which we add
             # in place. Key is the Komusan word, value the English one.
             pairs = {out_entry.get('word', ''): out_entry.get('en', '')
                      for out_entry in out_entries}
-            new_lines: list[list[str]] = []
-            words_seen = set()
-
-            with open(DICT_CSV, newline='', encoding='utf8') as csvfile:
-                reader = csv.reader(csvfile)
-                lines = list(reader)
-
-                for line in lines:
-                    word = line[1]
-                    words_seen.add(word)
+            lines = list(csv.reader(io.StringIO(csv_text)))
 
-                    if word in self.merged_words:
-                        # Replace with merged entry
-                        new_lines.append([pairs.get(word, ''), word])
-                    else:
-                        # Keep entry as is
-                        new_lines.append(line)
+            # Replace merged entries, keeping all others as is
+            new_lines = [[pairs.get(line[1], ''), line[1]] if line[1] in merged_words else line
+                         for line in lines]
 
             # Add all new (not yet seen) words after their English translations
-            for word, english in pairs.items():
-                if word not in words_seen:
-                    new_lines.append([english, word])
-
-            # Reopen file for writing
-            with open(DICT_CSV, 'w', newline='', encoding='utf8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerows(new_lines)
+            words_seen = {line[1] for line in lines}
+            new_lines.extend([english, word] for word, english in pairs.items()
+                             if word not in words_seen)
 
-        elif entries:
+        elif new_count:
             with open(DICT_CSV, 'a', newline='', encoding='utf8') as csvfile:
                 writer = csv.writer(csvfile)
-                for out_entry in out_entries[:len(entries)]:
+                for out_entry in out_entries[:new_count]:
                     # Add new entries at end of file
                     writer.writerow([out_entry.get('en'), out_entry.get('word')])
 
+        if new_lines is not None:
+            # All edits have been applied to the rows read above, so we rewrite the file once
+            # (atomically, so an interruption cannot leave it half-written)
+            util.write_csv_rows_atomically(new_lines, DICT_CSV)
+
     def add_entry_to_dict(self, entry: Optional[LineDict], export_needed: bool = True) -> None:
         """Add the selected candidate entry to the output dictionary and write it to disk.
 
@@ -1477,14 +1571,10 @@ class VocBuilder:
         # - first the donor language and any other languages that yield the same candidate,
         #   in alphabetic order
         # - then any other related languages, also in alphabetic
-        first_set = cand.find_langs_with_identical_candidate()
-        infl_set = set(cand.related_cands.keys())
-
-        if cand.lang:
-            # Will be empty (and is skipped) if the --word option is used
-            first_set.add(cand.lang)
-            infl_set.add(cand.lang)
-
+        # The donor language will be empty (and is skipped) if the --word option is used
+        own_lang = {cand.lang} if cand.lang else set()
+        first_set = cand.find_langs_with_identical_candidate() | own_lang
+        infl_set = cand.related_cands.keys() | own_lang
         second_set = infl_set - first_set
         extra_originals: dict[str, str] = {cand.lang: cand.show_original}
 
@@ -1499,13 +1589,19 @@ class VocBuilder:
         lang_codes_to_check = self._active_fallbacks & self._latin_fallback_set
         lang_codes_to_check |= self._latin_main_set
 
+        calc_distance = self.calc_distance
+        protect_ch_sh = self.protect_ch_sh
+
         for lang_code in lang_codes_to_check:
             if lang_code in infl_set:
                 continue
-            enfr_words = util.split_on_semicolons(entry.get(lang_code, ''))
-            for enfr_word in enfr_words:
+            translations = entry.get(lang_code, '')
+            if not translations:
+                # Many languages lack a translation, so there is nothing to split and compare
+                continue
+            for enfr_word in util.split_on_semicolons(translations):
                 enfr_word = util.discard_text_in_brackets(enfr_word)
-                if self.calc_distance(this_word, self.protect_ch_sh(enfr_word.lower()))[1]:
+                if calc_distance(this_word, protect_ch_sh(enfr_word.lower()))[1]:
                     second_set.add(lang_code)
                     extra_originals[lang_code] = enfr_word
                     break
@@ -1546,9 +1642,10 @@ class VocBuilder:
         Returns a error message if validation fails, otherwise None.
         """
         rest = gloss[1:]
-        if not rest.lower() in self.existing_words_dict:
+        rest_lower = rest.lower()
+        if rest_lower not in self.existing_words_dict:
             return f'Word "{rest}" doesn\'t exist in the dictionary'
-        if rest.lower() != word.lower():
+        if rest_lower != word.lower():
             return f'"{word}" and "{rest}" are different words'
         return None
 
@@ -1561,6 +1658,8 @@ class VocBuilder:
         2. True iff the first part is a prefix
         3. True iff the last part is a suffix
         """
+        # Keys of the existing words dict are lower-case, so each part is lower-cased just once
+        existing_words = self.existing_words_dict
         last_idx = len(parts) - 1
         errmsg = None
         first_is_prefix = False
@@ -1570,17 +1669,18 @@ class VocBuilder:
             if not part:
                 errmsg = 'part is empty'
                 break
-            if not part.lower() in self.existing_words_dict:
+            lower_part = part.lower()
+            if lower_part not in existing_words:
                 # Check if it's an affix
                 if idx == 0:
-                    alt_part = part + '-'
+                    alt_part = lower_part + '-'
                     first_is_prefix = True
                 elif idx == last_idx:
-                    alt_part = '-' + part
+                    alt_part = '-' + lower_part
                     last_is_suffix = True
                 else:
                     alt_part = ''
-                if not (alt_part and alt_part.lower() in self.existing_words_dict):
+                if not (alt_part and alt_part in existing_words):
                     errmsg = f'Part "{part}" doesn\'t exist in the dictionary'
                     break
         return errmsg, first_is_prefix, last_is_suffix
@@ -1667,7 +1767,7 @@ class VocBuilder:
             word = word[:-1]
 
         # Accept whitespace and '-' as separators
-        parts = re.split(r'\s+|-', word)
+        parts = COMPOUND_SEP_RE.split(word)
         last_part_idx = len(parts) - 1
 
         # Make sure that all parts exist -- all except the last one may also be prefixes
@@ -1682,7 +1782,9 @@ class VocBuilder:
                 variants.add(lower_part + '-')  # It might be a prefix
             if idx != 0:
                 variants.add('-' + lower_part)  # It might be a suffix
-            if variants.isdisjoint(self.existing_words_dict.keys()):
+            # (dict views check membership by hashing, rather than iterating over all keys as
+            # set.isdisjoint does when passed a non-set argument)
+            if self.existing_words_dict.keys().isdisjoint(variants):
                 missing_parts.append(part)
 
         if missing_parts:
@@ -1748,19 +1850,7 @@ class VocBuilder:
         2. The rationale for merging, read from the 'merge_rationale' parameter,
            the -amr CLI argument or else (if neither is set) the results of the polysemy check
         """
-        existing_entry = None
-        other_entries = []
-
-        for ex_en in self.existing_entries:
-            if ex_en.get('word', '') == merge_with:
-                existing_entry = ex_en
-            else:
-                other_entries.append(ex_en)
-
-        if not existing_entry:
-            sys.exit(f'error: Word "{merge_with}" doesn\'t exist in the dictionary')
-
-        self.existing_entries = other_entries
+        existing_entry = self.find_and_remove_komusan_entry(merge_with)
         entries_ordered = [entry, existing_entry] if premerge else [existing_entry, entry]
         combined_entry = self.do_merge_entries(*entries_ordered)
         matchdict, entry_langs = self.do_polysemy_check(entry)
@@ -1937,23 +2027,26 @@ class VocBuilder:
         """
         if not cand_list:
             return []  # Nothing to print
-        best_score = max(cand_list, key=lambda cand: cand.total_score).total_score
+
+        # Calculate the sort key of each candidate just once, also using it to find the best
+        # total score (negated in the key)
+        keys = [(-cand.count_related_natlang_cands(), -cand.total_score, cand.export_word())
+                for cand in cand_list]
+        best_neg_score = min(key[1] for key in keys)
 
         result = []
         num = 1
         possible_failure = ''
+        # Normalized forms are only needed if duplicates are forbidden
+        existing_norm_words = set() if self.args.allowduplicates else self.existing_norm_words
 
-        for cand in sorted(cand_list,
-                           key=lambda cand: (-cand.count_related_natlang_cands(),
-                                             -cand.total_score,
-                                             cand.export_word())):
-            norm_word = bu.normalize_word(cand.export_word())
-            star = '*' if cand.total_score == best_score else ' '
+        for key, cand in sorted(zip(keys, cand_list), key=itemgetter(0)):
+            star = '*' if key[1] == best_neg_score else ' '
 
             if constraints is not None:
                 possible_failure = constraints.fails(cand)
 
-            if norm_word in self.existing_norm_words and not self.args.allowduplicates:
+            if existing_norm_words and bu.normalize_word(key[2]) in existing_norm_words:
                 prefix = f'[SKIPPED (word exists already)]{star}  '
             elif len(cand.word) < min_length:  # Length in sounds, not letters
                 prefix = f'[SKIPPED (too short)]{star} '
@@ -1972,8 +2065,9 @@ class VocBuilder:
 
     def remember_word(self, word: str, entry: LineDict) -> None:
         """Add word to the sets of existing words, making it ineligible in further selections."""
-        classes = set(util.split_on_commas(entry.get('class', '')))
-        self.existing_words_dict[word.lower()] |= classes
+        classes = frozenset(util.split_on_commas(entry.get('class', '')))
+        key = sys.intern(word.lower())
+        self.existing_words_dict[key] = self.existing_words_dict.get(key, frozenset()) | classes
         self.existing_norm_words.add(bu.normalize_word(word))
 
     def present_cands_for_selection(self, cand_list: Sequence[Candidate],
@@ -2075,23 +2169,11 @@ class VocBuilder:
                     # Select best auxlang candidate, if its total score is >= 0.5
                     # (but skipping those with no related natlang candidates)
                     min_ts = 0.5
-                    for pos, cand in enumerate(sorted_eligible_list):
-                        identical_count = len(cand.find_langs_with_identical_candidate())
-                        if (cand.lang in self.auxlangs and cand.total_score >= min_ts
-                                and cand.has_suitable_related_natlang_cands()):
-                            chosen_cand = cand
-                            chosen_pos = pos
-                            choice_info = 'best eligible auxlang candidate'
-                            break
-                        elif identical_count >= 3 and cand.total_score >= min_ts:
-                            # Candidates shared by 3 or more (natural) languages are likewise
-                            # eligible, provided their total score is >= 0.5
-                            chosen_cand = cand
-                            chosen_pos = pos
-                            choice_info = 'first eligible candidate shared by 3+ languages'
-                            break
+                    auxlang_choice = self.find_auxlang_choice(sorted_eligible_list, min_ts)
 
-                    if not chosen_cand:
+                    if auxlang_choice:
+                        chosen_pos, chosen_cand, choice_info = auxlang_choice
+                    else:
                         LOG.info(f'No eligible auxlang candidate with a total score >= {min_ts} '
                                  'and related candidates found – will use the best natlang '
                                  'candidate instead.')
@@ -2119,6 +2201,29 @@ class VocBuilder:
             else:
                 LOG.info('++ Word has no eligible candidates!')
 
+    def find_auxlang_choice(self, sorted_eligible_list: Sequence[Candidate], min_ts: float
+                            ) -> Optional[Tuple[int, Candidate, str]]:
+        """Find the first candidate eligible for automatic selection when processing an auxfile.
+
+        A candidate is eligible if its total score is at least 'min_ts' and it's either an
+        auxlang candidate with suitable related natlang candidates or shared by 3 or more
+        (natural) languages.
+
+        Returns its position, the candidate itself, and a short explanation of the choice; or
+        None if there is no eligible candidate.
+        """
+        auxlangs = self.auxlangs
+        # Both conditions require the minimum score, which is cheap to check, so we test it
+        # first and only then look at the related candidates
+        for pos, cand in enumerate(sorted_eligible_list):
+            if cand.total_score < min_ts:
+                continue
+            if cand.lang in auxlangs and cand.has_suitable_related_natlang_cands():
+                return pos, cand, 'best eligible auxlang candidate'
+            if len(cand.find_langs_with_identical_candidate()) >= 3:
+                return pos, cand, 'first eligible candidate shared by 3+ languages'
+        return None
+
     def add_specified_word(self, candidates: dict[str, Sequence[Candidate]], word: str,
                            source: str) -> None:
         """Add the candidate specified by the --word option or an Add: constraint.
@@ -2138,7 +2243,7 @@ class VocBuilder:
         if val_err:
             sys.exit(f'error: {source} is phonetically invalid: {val_err}')
         norm_word = bu.normalize_word(cand.export_word())
-        if norm_word in self.existing_norm_words and not self.args.allowduplicates:
+        if not self.args.allowduplicates and norm_word in self.existing_norm_words:
             sys.exit(f'error: {source} "{cand.export_word()}" (normalized: {norm_word}) '
                      'exists already in the dictionary')
         candidates[''] = [cand]
@@ -2150,17 +2255,17 @@ class VocBuilder:
         candidates: dict[str, Sequence[Candidate]] = {}
         lang_codes = self._sourcelang_list
 
-        if self.args.consider:
-            extra_lang_codes = util.split_on_commas(self.args.consider)
-            LOG.info(f'Also considering candidates from {", ".join(extra_lang_codes)} as '
-                     'requested.')
-            lang_codes = lang_codes + extra_lang_codes
+        if self._extra_lang_codes:
+            LOG.info(self._consider_msg)
+            lang_codes = lang_codes + self._extra_lang_codes
         for langcode in lang_codes:
             cands = self.build_candidates_for_lang(langcode, langcode, entry)
             if cands:
                 candidates[langcode] = cands
             elif langcode in self._main_to_fallbacks:
                 for fallback_code in self._main_to_fallbacks[langcode]:
+                    if not entry.get(fallback_code):
+                        continue  # No translation, hence no candidates
                     # Some fallback languages (such as 'tpi') have their own mapping,
                     # while others (such as 'ur') use the mapping of the main language
                     if fallback_code in self.convdicts:
@@ -2180,7 +2285,7 @@ class VocBuilder:
             self.add_specified_word(candidates, self.args.word[0].strip(), '--word argument')
         return candidates
 
-    def do_polysemy_check(self, entry: LineDict) -> Tuple[dict[str, Set[str]], Set[str]]:
+    def do_polysemy_check(self, entry: LineDict) -> Tuple[dict[str, Set[str]], FrozenSet[str]]:
         """Check whether one might add this meaning to an existing word.
 
         Returns:
@@ -2196,25 +2301,31 @@ class VocBuilder:
         """
         # Mapping from our words to languages which share this meaning
         matchdict: dict[str, Set[str]] = defaultdict(set)
-        entry_langs = set()
-
-        for key, translations in entry.items():
-            if key not in self._full_sourcelang_set:
-                continue  # Only source languages are considered
-            entry_langs.add(key)
-
-            # Remove IPA or romanizations in brackets
-            translations = util.discard_text_in_brackets(translations)
-
-            for trans in util.split_on_semicolons(translations):
-                full_trans = f'{key}:{trans}'.lower()
-                our_words = self.polyseme_dict.get(full_trans, set())
-                for our_word in our_words:
-                    matchdict[our_word].add(key)
-                    ##LOG.info(f'{key} uses the same word')
+        # Only source languages are considered
+        entry_langs = self._full_sourcelang_set.intersection(entry.keys())
+        polyseme_dict = self.polyseme_dict
+
+        # Collect all translations in the "lang:translation" form used as keys of the
+        # polyseme dict, mapped to their language (removing IPA or romanizations in brackets)
+        wanted = {f'{key}:{trans}'.lower(): key
+                  for key in entry_langs & self.polyseme_langs
+                  for trans in util.split_on_semicolons(
+                      util.discard_text_in_brackets(entry[key]))}
+
+        # Look them all up at once
+        for full_trans in polyseme_dict.keys() & wanted.keys():
+            key = wanted[full_trans]
+            for our_word in polyseme_dict[full_trans]:
+                matchdict[our_word].add(key)
+                ##LOG.info(f'{key} uses the same word')
 
         return matchdict, entry_langs
 
+    def count_shared_langs(self, entry_langs: FrozenSet[str], word: str) -> int:
+        """Count the languages with translations of both an entry and one of our words."""
+        word_langs = self.langcode_sets.get(word)
+        return len(entry_langs & word_langs) if word_langs else 0
+
     def check_polysemy(self, entry: LineDict, do_print: bool = True) -> tuple[str | None,
                                                                               float | None]:
         """Check whether one might add this meaning to an existing word.
@@ -2234,9 +2345,28 @@ class VocBuilder:
             LOG.info(self.format_msg("Polysemy check: Don't consider merging these two concepts "
                                      '– no languages (0.0%) use the same word for both concepts.'))
 
+        if not do_print:
+            # Since we don't have to print anything, we can return with the first (best)
+            # candidate, so we pop candidates from a heap instead of sorting all of them
+            heap = [(-len(langset), word) for word, langset in matchdict.items()]
+            heapq.heapify(heap)
+            while heap:
+                neg_count, word = heapq.heappop(heap)
+                shared_lang_count = self.count_shared_langs(entry_langs, word)
+
+                if not shared_lang_count:
+                    if requested_check:
+                        LOG.info("Sorry, but the two words don't have any languages in common!")
+                    continue
+
+                percentage = -neg_count / shared_lang_count * 100.0
+                if percentage >= 40:
+                    return (word, percentage)
+                return (None, None)
+            return (None, None)
+
         for word, langset in sorted(matchdict.items(), key=lambda pair: (-len(pair[1]), pair[0])):
-            word_langs = self.langcode_sets.get(word, set())
-            shared_lang_count = len(entry_langs.intersection(word_langs))
+            shared_lang_count = self.count_shared_langs(entry_langs, word)
 
             if not shared_lang_count:
                 if requested_check:
@@ -2245,14 +2375,6 @@ class VocBuilder:
 
             percentage = len(langset) / shared_lang_count * 100.0
 
-            if not do_print:
-                # Since we don't have to print anything, we can return now with the first
-                # (best) candidate
-                if percentage >= 40:
-                    return (word, percentage)
-                else:
-                    return (None, None)
-
             if percentage < 33.3 and not requested_check:
                 ## LOG.info(f'--- {word}: {percentage:.1f}% ---')
                 continue
@@ -2342,10 +2464,11 @@ class VocBuilder:
 
         Note that the result list may be empty.
         """
+        kinds_to_add = self.kinds_to_add
         entries_by_key: dict[str, List[LineDict]] = defaultdict(list)
 
         for entry in entries:
-            if self.get_kind(entry) not in self.kinds_to_add:
+            if self.get_kind(entry) not in kinds_to_add:
                 # Entry has the wrong kind (e.g. 'noun' if we want to add an adjective)
                 continue
             entry_key = self.mk_entry_key(entry)
@@ -2354,17 +2477,16 @@ class VocBuilder:
         result = []
 
         for entry_key, entry_list in entries_by_key.items():
-            if len(entry_list) > 1:
-                LOG.info(f'Note: found {len(entry_list)} entries for "{entry_key}" -- will just '
-                         'keep the first noun')
-                for entry in entry_list:
-                    if entry.get('class') == 'noun':
-                        result.append(entry)
-                        break
-                else:
-                    LOG.warn('No noun found!')
+            if len(entry_list) == 1:
+                result.append(entry_list[0])
+                continue
+            LOG.info(f'Note: found {len(entry_list)} entries for "{entry_key}" -- will just '
+                     'keep the first noun')
+            noun = next((entry for entry in entry_list if entry.get('class') == 'noun'), None)
+            if noun is None:
+                LOG.warn('No noun found!')
             else:
-                result += entry_list
+                result.append(noun)
 
         return result
 
@@ -2390,26 +2512,48 @@ class VocBuilder:
             ## Trivial choice
             return cand_dict_list[0], entries[0]
 
-        list_of_cand_lists = []
+        def cand_strings(cand_dict: dict[str, Sequence[Candidate]]) -> Iterator[str]:
+            return (f'{cand.export_word()}/{cand.lang}'
+                    for cands in cand_dict.values() for cand in cands)
+
+        # Find the alphabetically first candidate of each dictionary – usually that's enough
+        # to decide, so there's no need to sort all of them
+        firsts = [min(cand_strings(cand_dict), default='') for cand_dict in cand_dict_list]
+        first = min(firsts)
+        tied_positions = [pos for pos, cand_str in enumerate(firsts) if cand_str == first]
 
-        # Build lists of candidates and sort them alphabetically
-        for cand_dict in cand_dict_list:
-            cand_list = []
-            for cands in cand_dict.values():
-                for cand in cands:
-                    cand_list.append(f'{cand.export_word()}/{cand.lang}')
-            cand_list.sort()
-            list_of_cand_lists.append(cand_list)
+        if len(tied_positions) == 1:
+            pos = tied_positions[0]
+        else:
+            # Break ties by comparing the full sorted lists of candidates
+            pos, _ = min(((pos, sorted(cand_strings(cand_dict_list[pos])))
+                          for pos in tied_positions), key=itemgetter(1))
 
-        # Choose the list that comes alphabetically first and its position
-        pos, first_list = min(enumerate(list_of_cand_lists), key=itemgetter(1))
         selected_cand_dict = cand_dict_list[pos]
         selected_entry = entries[pos]
         en_word = selected_entry['en']
         LOG.info(self.format_msg(f'Will handle "{en_word}" first because it has the '
-                                 f'alphabetically first candidate: {first_list[0]}.'))
+                                 f'alphabetically first candidate: {first}.'))
         return selected_cand_dict, selected_entry
 
+    def get_entry_index(self, entry_map: dict[int, List[LineDict]]
+                        ) -> dict[Tuple[str, Optional[str]], List[LineDict]]:
+        """Return an index mapping (English word, sense) pairs to the entries in 'entry_map'.
+
+        Entries are listed in the order in which they appear in 'entry_map'. The index is
+        built on first use and rebuilt if a different entry map is passed or if it was
+        invalidated (by setting self._entry_index_map to None) after an entry was modified.
+        """
+        if self._entry_index_map is not entry_map:
+            index: dict[Tuple[str, Optional[str]], List[LineDict]] = defaultdict(list)
+            for entry_list in entry_map.values():
+                for entry in entry_list:
+                    key = (util.discard_text_in_brackets(entry.get('en', '')), entry.get('sense'))
+                    index[key].append(entry)
+            self._entry_index = index
+            self._entry_index_map = entry_map
+        return self._entry_index
+
     def find_entry(self, entry_map: dict[int, List[LineDict]], word: str, sense: str) -> LineDict:
         """Find the entry with the specified English word and word sense.
 
@@ -2426,12 +2570,12 @@ class VocBuilder:
         if '//' in sense:
             sense, cls = sense.split('//', 1)
 
-        for entry_list in entry_map.values():
-            for entry in entry_list:
-                if (util.discard_text_in_brackets(entry.get('en', '')) == word
-                        and entry.get('sense') == sense):
-                    if cls is None or entry.get('class') == cls:
-                        return entry
+        for entry in self.get_entry_index(entry_map).get((word, sense), ()):
+            # Entries may have been modified since the index was built, hence we check again
+            if (util.discard_text_in_brackets(entry.get('en', '')) == word
+                    and entry.get('sense') == sense):
+                if cls is None or entry.get('class') == cls:
+                    return entry
         sys.exit(f'error: No matching entry found for "{word}" ({sense})')
 
     def look_up_entry(self, entry_map: dict[int, List[LineDict]], word: str,
@@ -2451,34 +2595,25 @@ class VocBuilder:
             return entry
         return self.find_entry(entry_map, word, sense)
 
-    def process_aux_line(self, english: str, senses: str, constraint_str: str,
-                         aux_candidates: dict[str, str], line_no: int,
-                         entry_map: dict[int, List[LineDict]]) -> None:
-        """Process a line from the auxfile, choosing the best among the listed auxlang candidates.
+    def is_aux_line_done(self, english_words: str, senses: str) -> bool:
+        """Check whether the first concept listed in an auxfile line exists already.
 
-        See the docs for the "process_auxfile" function for an explanation of the arguments.
+        That's typically the case if the line was committed in an earlier run. Since such
+        entries are skipped when reading the term dictionary, they couldn't be looked up anyway.
+        """
+        if not senses:
+            return False
+        word = util.split_on_commas(english_words)[0]
+        sense = util.split_on_pipes(senses)[0].split('//', 1)[0]
+        return self.format_entry_key(word, sense) in self.skipped_entry_keys
+
+    def look_up_and_merge_entries(self, english_words: str, senses: str, line_no: int,
+                                  entry_map: dict[int, List[LineDict]]) -> LineDict:
+        """Look up the concepts listed in an auxfile line and merge them into a single entry.
+
+        There may be several comma-separated English words, and several pipe-separated senses.
+        See the docs for the "process_auxfile" function for details.
         """
-        # Clear the cache of candidates generates for earlier words
-        self.candi_cache.clear()
-
-        # Parse and print constraints, if any
-        constraint_str = constraint_str.strip()
-        if constraint_str:
-            constraints = bu.Constraints(constraint_str)
-            LOG.info(str(constraints) + '.')
-        else:
-            constraints = None
-
-        # There may be an explanatory comment in parenthesis at the end of the English word
-        english_words, comment = util.split_text_and_explanation(english)
-
-        # Some affixes have only a comment-like explanation, no actual word – in that case
-        # we restore the comment as word
-        if comment and not english_words:
-            english_words = f'({comment})'
-            comment = None
-
-        # There may be several comma-separated English words, and several pipe-separated senses
         en_list = util.split_on_commas(english_words)
         sense_list = util.split_on_pipes(senses)
         # Pop first English word and its sense
@@ -2506,6 +2641,45 @@ class VocBuilder:
                 LOG.warn(f'English words without corresponding senses in line #{line_no} will '
                          f'be ignored: {", ".join(en_list)}')
                 break
+        return entry
+
+    def process_aux_line(self, english: str, senses: str, constraint_str: str,
+                         aux_candidates: dict[str, str], line_no: int,
+                         entry_map: dict[int, List[LineDict]]) -> None:
+        """Process a line from the auxfile, choosing the best among the listed auxlang candidates.
+
+        See the docs for the "process_auxfile" function for an explanation of the arguments.
+        """
+        # Clear the cache of candidates generates for earlier words
+        self.candi_cache.clear()
+
+        # There may be an explanatory comment in parenthesis at the end of the English word
+        english_words, comment = util.split_text_and_explanation(english)
+
+        # Some affixes have only a comment-like explanation, no actual word – in that case
+        # we restore the comment as word
+        if comment and not english_words:
+            english_words = f'({comment})'
+            comment = None
+
+        if self.is_aux_line_done(english_words, senses):
+            LOG.info(f'Skipping line #{line_no} ({english_words}) since its first concept exists '
+                     'already in the dictionary.')
+            return
+
+        # Parse and print constraints, if any
+        constraint_str = constraint_str.strip()
+        if constraint_str:
+            constraints = bu.Constraints(constraint_str)
+            LOG.info(str(constraints) + '.')
+        else:
+            constraints = None
+
+        if senses and ',' not in english_words and '|' not in senses:
+            # Common case: a single concept, so there's nothing to split or merge
+            entry = self.look_up_entry(entry_map, english_words.strip(), senses.strip())
+        else:
+            entry = self.look_up_and_merge_entries(english_words, senses, line_no, entry_map)
 
         # Add the auxlang translations (semicolon-separated)
         for auxlang, candidates in aux_candidates.items():
@@ -2513,8 +2687,10 @@ class VocBuilder:
             entry.add(auxlang, candidates)
 
         if comment:
-            # Add the comment back to the English word
+            # Add the comment back to the English word -- since this changes an entry that
+            # might be indexed, the index used by find_entry must be rebuilt
             entry.append_to_val('en', f' ({comment})')
+            self._entry_index_map = None
 
         # Generate and rank candidates, choosing the most suitable one
         cand_dict = self.build_candidates(entry, constraints)
@@ -2548,40 +2724,44 @@ class VocBuilder:
         ones give the names of the auxlangs to consider.
 
         Once a line is too short or the English word is empty, processing stops.
+
+        Lines whose first concept exists already in the dictionary (typically because they were
+        committed in an earlier run) are skipped.
         """
         auxfile = self.args.auxfile
         LOG.info(f'Processing entries in auxfile {auxfile}.')
 
+        # The file is small, so we parse it in one go rather than keeping it open while
+        # candidates are built and selected
         with open(auxfile, newline='', encoding='utf8') as csvfile:
-            reader = csv.reader(csvfile)
-            for line_no, row in enumerate(reader, start=1):
-                if line_no == 1:
-                    # Read names of auxlangs
-                    auxlangs = row[3:]
-                    # Store them as attribute and add them to our list of source languages
-                    # (lower-cased)
-                    self.auxlangs = [auxlang.lower() for auxlang in auxlangs]
-                    self._sourcelang_list.extend(self.auxlangs)
-                    continue
+            rows = list(csv.reader(csvfile))
+
+        for line_no, row in enumerate(rows, start=1):
+            if line_no == 1:
+                # Read names of auxlangs, lower-cased just once, store them as attribute and
+                # add them to our list of source languages
+                auxlangs = [auxlang.lower() for auxlang in row[3:]]
+                self.auxlangs = auxlangs
+                self._sourcelang_list.extend(auxlangs)
+                row_width = max(len(row), 3)
+                continue
 
-                # Process entry (may represent several related concepts)
-                english = util.get_elem(row, 0)
-                if not english:
-                    LOG.info(f'No English word found in line {line_no} of {auxfile} – '
-                             'stopping processing.')
-                    break
+            # Pad short rows so all cells can be unpacked at once
+            if len(row) < row_width:
+                row += [''] * (row_width - len(row))
+            english, senses, constraint_str, *aux_cells = row[:row_width]
 
-                senses = util.get_elem(row, 1)
-                constraint_str = util.get_elem(row, 2)
-                aux_candidates = {}
+            # Process entry (may represent several related concepts)
+            if not english:
+                LOG.info(f'No English word found in line {line_no} of {auxfile} – '
+                         'stopping processing.')
+                break
 
-                for auxpos, auxlang in enumerate(auxlangs, start=3):
-                    auxcand = util.get_elem(row, auxpos)
-                    if auxcand and auxcand not in ('-', '–'):
-                        aux_candidates[auxlang.lower()] = auxcand
+            aux_candidates = {auxlang: auxcand for auxlang, auxcand in zip(auxlangs, aux_cells)
+                              if auxcand and auxcand not in ('-', '–')}
 
-                self.process_aux_line(english, senses, constraint_str, aux_candidates, line_no,
-                                      entry_map)
+            self.process_aux_line(english, senses, constraint_str, aux_candidates, line_no,
+                                  entry_map)
 
         # If any words were chosen and committed, export them and update the selection log
         if self.chosen_candidates:
@@ -2634,14 +2814,34 @@ class VocBuilder:
             kind_list = [Kind.NOUN, Kind.ADJ, Kind.NOUN, Kind.VERB]
             kind_list = [kind for kind in kind_list if kind not in overshot_kinds]
             remaining_overshoot = overshoot
+            weights = {kind: kind_list.count(kind) for kind in kind_list}
+
+            while remaining_overshoot:
+                # As long as all kinds that can still be reduced have enough room, we can
+                # handle as many complete passes through the list at once as the remaining
+                # overshoot allows
+                room = {kind: target_counts[kind] - counter[kind] for kind in weights}
+                reducible = [kind for kind in weights if room[kind] > 0]
+                if not reducible:
+                    # Shouldn't happen -- the sanity checks below will complain if it does
+                    break
+                passes = min(min(room[kind] // weights[kind] for kind in reducible),
+                             remaining_overshoot // sum(weights[kind] for kind in reducible))
 
-            for kind in cycle(kind_list):
-                if target_counts[kind] > counter[kind]:
-                    # We still can safely reduce the target count of this kind
-                    target_counts[kind] -= 1
-                    remaining_overshoot -= 1
-                    if not remaining_overshoot:
-                        break
+                if passes:
+                    for kind in reducible:
+                        target_counts[kind] -= passes * weights[kind]
+                    remaining_overshoot -= passes * sum(weights[kind] for kind in reducible)
+                    continue
+
+                # Otherwise we make a single pass, stopping once the overshoot is used up
+                for kind in kind_list:
+                    if target_counts[kind] > counter[kind]:
+                        # We still can safely reduce the target count of this kind
+                        target_counts[kind] -= 1
+                        remaining_overshoot -= 1
+                        if not remaining_overshoot:
+                            break
 
         # Calculate how many concepts of each kind we need to find, dropping those we don't need
         needed_kinds = {kind: target_counts[kind] - counter.get(kind, 0) for kind in target_counts}
@@ -2666,48 +2866,62 @@ class VocBuilder:
             msg += f'; original overshoot: {overshoot}'
         LOG.info(msg + '.')
 
-        # Open output CSV file for writing and add header, after moving an existing version away
+        # Find concepts to add, starting with the highest transcount -- methods used for each
+        # entry are bound to local names once
+        count_map = self.sort_entries_by_transcount()
+        get_kind = self.get_kind
+        discard_text_in_brackets = util.discard_text_in_brackets
+        check_polysemy = self.check_polysemy
+        polyseme_langs = self.polyseme_langs
+        rows: List[List[str]] = []
+
+        for count in self.counts_descending(count_map):
+            for entry in count_map[count]:
+                # Check if we need an entry of this kind
+                kind = get_kind(entry)
+                still_needed = needed_kinds.get(kind, 0)
+                if still_needed:
+                    english = discard_text_in_brackets(entry.get('en', ''))
+                    sense = entry.get('sense', '')
+
+                    # Check if the polysemy check suggestions a merger (impossible if the
+                    # entry shares no languages with the polyseme dict)
+                    if polyseme_langs.isdisjoint(entry.keys()):
+                        merge_word, merge_percentage = None, None
+                    else:
+                        merge_word, merge_percentage = check_polysemy(entry, False)
+                    if merge_word:
+                        merge_constraint = f'Merge:{merge_word} ({merge_percentage:.1f}%)'
+                    else:
+                        merge_constraint = ''
+
+                    # Remember row
+                    row = [english, sense]
+                    if merge_constraint:
+                        row.append(merge_constraint)
+                    rows.append(row)
+
+                    # Update remaining needed counts, removing kinds that are no longer needed
+                    # -- entries that shall be merged don't count
+                    if not merge_constraint:
+                        if still_needed == 1:
+                            del needed_kinds[kind]
+                        else:
+                            needed_kinds[kind] = still_needed - 1
+
+                if not needed_kinds:
+                    break
+            if not needed_kinds:
+                break
+
+        # Write output CSV file with header, after moving an existing version away
         outfilenname = f'top{concept_count}.csv'
         util.rename_to_backup(outfilenname)
         with open(outfilenname, 'w', newline='', encoding='utf8') as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow('English Sense Constraints'.split()
                             + [lang.capitalize() for lang in sorted(util.DEFAULT_AUXLANGS)])
-
-            # Find concepts to add
-            for _count, entries_by_count in sorted(self.sort_entries_by_transcount().items(),
-                                                   reverse=True):
-                for entry in entries_by_count:
-                    # Check if we need an entry of this kind
-                    kind = self.get_kind(entry)
-                    if kind in needed_kinds:
-                        english = util.discard_text_in_brackets(entry.get('en', ''))
-                        sense = entry.get('sense', '')
-
-                        # Check if the polysemy check suggestions a merger
-                        merge_word, merge_percentage = self.check_polysemy(entry, False)
-                        if merge_word:
-                            merge_constraint = f'Merge:{merge_word} ({merge_percentage:.1f}%)'
-                        else:
-                            merge_constraint = ''
-
-                        # Write row
-                        row = [english, sense]
-                        if merge_constraint:
-                            row.append(merge_constraint)
-                        writer.writerow(row)
-
-                        # Update remaining needed counts, removing kinds that are no longer needed
-                        # -- entries that shall be merged don't count
-                        if not merge_constraint:
-                            needed_kinds[kind] -= 1
-                            if needed_kinds[kind] <= 0:
-                                del needed_kinds[kind]
-
-                    if not needed_kinds:
-                        break
-                if not needed_kinds:
-                    break
+            writer.writerows(rows)
 
     def process_requested_entry(self, entry_map: dict[int, List[LineDict]]) -> None:
         """Process the entry requested by the --add command."""
@@ -2753,6 +2967,7 @@ class VocBuilder:
         entry_1.add('word', POLY_DUMMY)
         self.polyseme_dict = self.fill_polyseme_dict([entry_1])
         self.langcode_sets = self.fill_langcode_sets([entry_1])
+        self.polyseme_langs = self.find_polyseme_langs(self.polyseme_dict)
 
         # Do check on second entry
         self.check_polysemy(entry_2)
@@ -2767,7 +2982,7 @@ class VocBuilder:
         Senses are merged by separated them with a ' | ' (a pipe character surrounded by
         spaces).
 
-        In general, only the first class it kept if they are different. However, if one of
+        In general, only the first class is kept if they are different. However, if one of
         the classes is an affix, both are kept (comma-separated).
 
         If both entries have the same word class, it won't be duplicated; otherwise, the two
@@ -2775,41 +2990,15 @@ class VocBuilder:
 
         The "transcount" field is merged by keeping the larger value.
         """
-        # pylint: disable=too-many-branches, too-many-locals, too-many-statements
+        # pylint: disable=too-many-locals
         combined_entry = LineDict()
 
         for key, value in entry.items():
             value_2 = other_entry.get(key, '')
-            if not value_2:
-                joint_value = value
-            elif key == 'class':
-                if value == value_2:
-                    joint_value = value
-                elif value.endswith('fix') or value_2.endswith('fix'):
-                    if ',' in value:
-                        # The first is a list such as 'noun, suffix': only append the second
-                        # value if it's not yet part of the list
-                        existing_classes = set(util.split_on_commas(value))
-                        if value_2 in existing_classes:
-                            joint_value = value
-                        else:
-                            joint_value = value + ', ' + value_2
-                    else:
-                        joint_value = value + ', ' + value_2
-                else:
-                    # Just keep the first value
-                    joint_value = value
-            elif key == 'sense':
-                joint_value = value + ' | ' + value_2
-            elif key == 'transcount':
-                joint_value = str(max(int(value), int(value_2)))
+            if value_2:
+                joint_value = MERGE_FUNCTIONS.get(key, merge_semicolon_lists)(value, value_2)
             else:
-                words = set(util.split_on_semicolons(value))
-                joint_word_list = [value]
-                for word in util.split_on_semicolons(value_2):
-                    if word not in words:
-                        joint_word_list.append(word)
-                joint_value = '; '.join(joint_word_list)
+                joint_value = value
             combined_entry.add(key, joint_value)
 
         # Check if sense disambiguation is possible without problems
@@ -2893,12 +3082,20 @@ class VocBuilder:
 
         entry_str = 'entry' if len(entries) == 1 else 'entries'
         LOG.info(f'Processing {len(entries)} {entry_str} with {transcount} translations.')
-        cand_dict_list: List[dict[str, Sequence[Candidate]]] = []
-        for entry in entries:
-            cand_dict_list.append(self.build_candidates(entry))
-        cand_dict, entry = self.select_cand_dict_to_handle_first(cand_dict_list, entries)
+        cand_dict: Optional[dict[str, Sequence[Candidate]]] = None
+
+        if len(entries) == 1:
+            # Trivial choice -- candidates are built below, unless a merge makes them unnecessary
+            entry = entries[0]
+        else:
+            # The choice depends on the candidates, so we must build them for all entries
+            cand_dict_list = [self.build_candidates(entry) for entry in entries]
+            cand_dict, entry = self.select_cand_dict_to_handle_first(cand_dict_list, entries)
+
         if self.args.merge:
             cand_dict, entry = self.merge_entries(entry, all_entries)
+        elif cand_dict is None:
+            cand_dict = self.build_candidates(entry)
         self.select_candidate(cand_dict, entry)
         return len(entries)
 
@@ -2910,15 +3107,13 @@ class VocBuilder:
 
         The word to delete and the reason for the deletion are read from the specified option.
         """
-        # pylint: disable=too-many-branches, too-many-locals
+        # pylint: disable=too-many-locals
         if self.args.delete_only:
             word, reason = self.args.delete_only
             delete_derivatives = False
-            runs_required = 1
         else:
             word, reason = self.args.delete
             delete_derivatives = True
-            runs_required = 2
 
         word = word.strip()
         word_lower = word.lower()
@@ -2937,41 +3132,51 @@ class VocBuilder:
                 if this_word.startswith('-') or this_word.endswith('-'):
                     words_to_delete_lower.add(this_word.strip('-'))
 
-        word_seen = False
+        # The lowercased words of all entries are needed below, so we calculate them just once
+        entry_words_lower = [entry.get('word', '').lower() for entry in self.existing_entries]
 
-        # If --delete is used, we run this code twice to also catch indirect derivatives,
-        # e.g. "jen brasili" is derived from "brasili" which is derived from "Brasil"
-        for _idx in range(runs_required):
-            entries_to_keep: List[LineDict] = []
-            for entry in self.existing_entries:
-                this_word = entry.get('word', '')
-                this_word_lower = this_word.lower()
-                this_gloss = entry.get('gloss', '')
+        if delete_derivatives:
+            # Index entries by the parts of their words (if they have several) and glosses
+            entries_by_part: dict[str, List[LineDict]] = defaultdict(list)
+            for entry, this_word_lower in zip(self.existing_entries, entry_words_lower):
+                parts = set()
                 if ' ' in this_word_lower or '-' in this_word_lower:
-                    parts = re.split(r'[ -]+', this_word_lower)
-                else:
-                    parts = []
-
-                if word_lower == this_word_lower or (delete_derivatives and any(
-                        deletable_word in parts for deletable_word in words_to_delete_lower)):
-                    if word == this_word:
-                        word_seen = True
-                    else:
-                        words_to_delete.add(this_word)
-                        words_to_delete_lower.add(this_word.lower())
-                elif delete_derivatives and this_gloss:
-                    parts = this_gloss.lower().split('+')
-                    if any(deletable_word in parts for deletable_word in words_to_delete_lower):
+                    parts.update(WORD_PART_SEP_RE.split(this_word_lower))
+                this_gloss = entry.get('gloss', '')
+                if this_gloss:
+                    parts.update(this_gloss.lower().split('+'))
+                for part in parts:
+                    entries_by_part[part].append(entry)
+
+            # Find derivatives, derivatives of derivatives etc., e.g. "jen brasili" is derived
+            # from "brasili" which is derived from "Brasil"
+            words_to_check = deque(words_to_delete_lower)
+            while words_to_check:
+                for entry in entries_by_part.get(words_to_check.popleft(), ()):
+                    this_word = entry.get('word', '')
+                    if this_word not in words_to_delete:
                         words_to_delete.add(this_word)
-                        words_to_delete_lower.add(this_word.lower())
+                        this_word_lower = this_word.lower()
+                        if this_word_lower not in words_to_delete_lower:
+                            words_to_delete_lower.add(this_word_lower)
+                            words_to_check.append(this_word_lower)
 
-                if this_word not in words_to_delete:
-                    entries_to_keep.append(entry)
-            self.existing_entries = entries_to_keep
+        # Also delete variants of the word that differ only in case
+        word_seen = False
+        for entry, this_word_lower in zip(self.existing_entries, entry_words_lower):
+            this_word = entry.get('word', '')
+            if this_word == word:
+                word_seen = True
+            elif this_word_lower == word_lower:
+                words_to_delete.add(this_word)
 
         if not word_seen:
             sys.exit(f'error: "{word}" not found in the dictionary')
 
+        # Keep all other entries, filtering the list in a single pass
+        self.existing_entries = [entry for entry in self.existing_entries
+                                 if entry.get('word', '') not in words_to_delete]
+
         self.add_entry_to_dict(None)
         words_joined = '"' + '", "'.join(words_to_delete) + '"'
         LOG.info(self.format_msg(
@@ -3005,8 +3210,8 @@ class VocBuilder:
         else:
             # If no specific entry was requested, we add one of the entries with the highest
             # number of translations
-            for count, entries in sorted(count_map.items(), key=lambda pair: -pair[0]):
-                addcount += self.process_entry_batch(entries, count, count_map)
+            for count in self.counts_descending(count_map):
+                addcount += self.process_entry_batch(count_map[count], count, count_map)
                 if addcount >= 1:
                     break  # We process just one word at a time
 
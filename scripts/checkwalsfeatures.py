@@ -2,8 +2,11 @@
 """Check some WALS features for consistency and completeness."""
 
 from collections import Counter, defaultdict
+from itertools import chain
 import logging
-from typing import DefaultDict, Dict
+import re
+from operator import attrgetter
+from typing import DefaultDict, Dict, Set, Tuple
 from typing import Counter as CounterType
 
 from printwalsarea import FeatureValue
@@ -15,6 +18,9 @@ import walsfeaturefreq
 
 INOUTFILE = walsfeaturefreq.OUTFILE
 
+# The numeric part of a feature map ID, e.g. '56' in '56E'
+FEATURE_NUMBER_RE = re.compile(r'\d+')
+
 
 ##### Main class and entry point #####
 
@@ -65,16 +71,11 @@ class WalsChecker:
             self._all_well = False
             return
 
-        # Count how often each language occurs
-        lang_counter: CounterType[str] = Counter()
-        for feature in features:
-            lang_counter.update(feature.languages)
-
-        # Count fallbacks for main languages instead (e.g. 'ur' is counted as 'hi')
-        for fallback, main in self._fallback_map.items():
-            if fallback in lang_counter:
-                lang_counter[main] += lang_counter[fallback]
-                del lang_counter[fallback]
+        # Count how often each language occurs, counting fallbacks for main languages instead
+        # (e.g. 'ur' is counted as 'hi')
+        fallback_map = self._fallback_map
+        lang_counter: CounterType[str] = Counter(
+            fallback_map.get(lang, lang) for feature in features for lang in feature.languages)
 
         # Check that no language is listed repeatedly
         repeated_langs = {lang: count for lang, count in lang_counter.items() if count >= 2}
@@ -84,14 +85,13 @@ class WalsChecker:
             self._all_well = False
 
         # Check that all source languages are listed and that no other languages are
-        langs_listed = set(lang_counter.keys())
-        missing_languages = self._source_set - langs_listed
+        missing_languages = self._source_set - lang_counter.keys()
         if missing_languages:
             logging.warning(f'Some languages are missing for feature map {feature_map}: '
                             f'{", ".join(sorted(missing_languages))}')
             self._all_well = False
 
-        extra_languages = langs_listed - self._source_set
+        extra_languages = lang_counter.keys() - self._source_set
         if extra_languages:
             logging.warning(f'Spurious languages listed for feature map {feature_map}: '
                             f'{", ".join(sorted(extra_languages))}')
@@ -120,11 +120,11 @@ class WalsChecker:
                 features_are_out_of_order = True
             prev_lang_count = actual_lang_count
 
-        if features_are_out_of_order:
-            # Features need to be resorted, from highest to lowest language count
-            features = sorted(features, key=lambda f: f.language_count, reverse=True)
-
         if data_has_changed:
+            if features_are_out_of_order:
+                # Features need to be resorted, from highest to lowest language count
+                features.sort(key=attrgetter('language_count'), reverse=True)
+
             # Relative frequencies need to be recalculated
             top_lang_count = features[0].language_count
             for feature in features:
@@ -134,34 +134,34 @@ class WalsChecker:
             self._feature_maps[feature_map] = features
             self._data_has_changed = True
 
+    def _group_article_languages(self, feature_map: str) -> DefaultDict[int, Set[str]]:
+        """Group the languages of an article feature map (37A or 38A) by their values.
+
+        Values 4 and 5 are kept, while all other values are grouped together under 0.
+        """
+        result: DefaultDict[int, Set[str]] = defaultdict(set)
+        for feature in self._feature_maps[feature_map]:
+            result[feature.value if feature.value in (4, 5) else 0].update(feature.languages)
+        return result
+
     def _check_consistency_between_article_features(self) -> None:
         """Check that the features maps referring to articles are consistent with each other.
 
         Prints a warning and sets self._all_well to False if problems are detected.
         """
-        has_neither: CounterType[str] = Counter()
-        has_definite = set()
-        has_definite_but_no_indefinite = set()
-        has_indefinite = set()
-        has_indefinite_but_no_definite = set()
-
-        for feature in self._feature_maps['37A']:
-            match feature.value:
-                case 5:  # Neither definite nor indefinite article
-                    has_neither.update(feature.languages)
-                case 4:  # No definite article but indefinite article
-                    has_indefinite_but_no_definite.update(feature.languages)
-                case _:  # Some kind of definite article
-                    has_definite.update(feature.languages)
-
-        for feature in self._feature_maps['38A']:
-            match feature.value:
-                case 5:  # Neither definite nor indefinite article
-                    has_neither.update(feature.languages)
-                case 4:  # No indefinite article but definite article
-                    has_definite_but_no_indefinite.update(feature.languages)
-                case _:  # Some kind of indefinite article
-                    has_indefinite.update(feature.languages)
+        # Value 5 means "neither definite nor indefinite article" in both feature maps
+        has_neither: CounterType[str] = Counter(chain.from_iterable(
+            feature.languages for feature_map in ('37A', '38A')
+            for feature in self._feature_maps[feature_map] if feature.value == 5))
+
+        # Value 4 means that a language has only the other kind of article, any other value
+        # except 5 that it has some kind of the article in question
+        langs_per_value = self._group_article_languages('37A')
+        has_indefinite_but_no_definite = langs_per_value[4]
+        has_definite = langs_per_value[0]
+        langs_per_value = self._group_article_languages('38A')
+        has_definite_but_no_indefinite = langs_per_value[4]
+        has_indefinite = langs_per_value[0]
 
         # "Neither" features should be identical, hence each language should occur twice
         singleton_languages = {lang: count for lang, count in has_neither.items() if count == 1}
@@ -200,47 +200,62 @@ class WalsChecker:
         features2 = self._feature_maps[fmap2]
         old_extra_features = self._feature_maps.get(outfmap)
 
-        # For each mentioned source language, calculate its cross-combined feature name (value)
-        combined_names_per_language = {}
+        # For each mentioned source language, find the pair of feature names (values) to
+        # combine -- '???' is used for a part if the language isn't mentioned in that map.
+        # If a language has several values in the second map, they are all joined by slashes
+        name_pairs_per_language: Dict[str, Tuple[str, str]] = {}
+        langs_in_features2 = set()
 
         for feature in features1:
             for lang in feature.languages:
-                combined_names_per_language[lang] = feature.name
+                name_pairs_per_language[lang] = (feature.name, '???')
 
         for feature in features2:
             for lang in feature.languages:
-                combined_name = combined_names_per_language.get(lang, '???')
-                combined_names_per_language[lang] = combined_name + '/' + feature.name
+                first_name, second_name = name_pairs_per_language.get(lang, ('???', '???'))
+                if lang in langs_in_features2:
+                    second_name += '/' + feature.name
+                else:
+                    second_name = feature.name
+                    langs_in_features2.add(lang)
+                name_pairs_per_language[lang] = (first_name, second_name)
+
+        # Calculate the cross-combined feature name of each language, creating each distinct
+        # name only once
+        combined_names: Dict[Tuple[str, str], str] = {}
+        combined_names_per_language = {}
 
-        # Add '/???' for languages mentioned in the first, but not the second feature map
-        for lang, name in combined_names_per_language.items():
-            if '/' not in name:
-                combined_names_per_language[lang] += '/???'
+        for lang, name_pair in name_pairs_per_language.items():
+            combined_name = combined_names.get(name_pair)
+            if combined_name is None:
+                combined_name = combined_names[name_pair] = '/'.join(name_pair)
+            combined_names_per_language[lang] = combined_name
 
-        # Sort set of combined names and assign them numeric values based on their sort order
-        sorted_names = sorted(set(combined_names_per_language.values()))
-        name_value_map = {name: idx for idx, name in enumerate(sorted_names, start=1)}
+        # Sort the distinct combined names and assign them numeric values based on their sort
+        # order
+        name_value_map = {name: idx for idx, name in enumerate(
+            sorted(set(combined_names.values())), start=1)}
 
         # Create resulting features
         name_feature_map: Dict[str, FeatureValue] = {}
-        for lang, name in sorted(combined_names_per_language.items()):
+        for lang, name in combined_names_per_language.items():
             feature = name_feature_map.get(name)
             if feature:
-                # Just add the language
+                # Just add the language, keeping the language count up to date
                 feature.languages.append(lang)
+                feature.language_count += 1
             else:
-                # Create new feature (count and relative frequency will be set later)
-                feature = FeatureValue(outfmap, name_value_map[name], name, [lang], 0, 0)
+                # Create new feature (relative frequency will be set later)
+                feature = FeatureValue(outfmap, name_value_map[name], name, [lang], 1, 0)
                 name_feature_map[name] = feature
 
-        extra_features = name_feature_map.values()
-
-        # Add language counts
-        for feature in extra_features:
-            feature.language_count = len(feature.languages)
-
-        # Sort based on language count (highest to lowest)
-        sorted_extra_features = sorted(extra_features, key=lambda f: f.language_count, reverse=True)
+        # Sort the languages of each feature, then the features based on language count
+        # (highest to lowest) -- ties are sorted by their first language
+        for feature in name_feature_map.values():
+            feature.languages.sort()
+        sorted_extra_features = sorted(
+            name_feature_map.values(),
+            key=lambda feature: (-feature.language_count, feature.languages[0]))
 
         # Add relative frequencies
         top_lang_count = sorted_extra_features[0].language_count
@@ -251,6 +266,12 @@ class WalsChecker:
             self._feature_maps[outfmap] = sorted_extra_features
             self._data_has_changed = True
 
+    @staticmethod
+    def _feature_map_sort_key(mapname: str) -> Tuple[int, str]:
+        """Return the key used to sort feature maps: first their numeric part, then full name."""
+        match = FEATURE_NUMBER_RE.search(mapname)
+        return (int(match.group()) if match else 0, mapname)
+
     def check(self) -> None:
         """Run all relevant checks."""
         for feature_id in ('37A', '38A', '117A', '121A'):
@@ -267,12 +288,10 @@ class WalsChecker:
             util.rename_to_backup(INOUTFILE)
             with util.open_csv_writer(INOUTFILE) as writer:
                 writer.writerow(self._header)
-                # We sort the feature maps first by their numeric part, then by their full name
-                for mapname in sorted(self._feature_maps, key=lambda x:
-                                      (int(''.join(filter(str.isdigit, x))), x)):
-                    feature_map = self._feature_maps[mapname]
-                    for feature in feature_map:
-                        writer.writerow(feature.to_row())
+                writer.writerows(
+                    feature.to_row()
+                    for mapname in sorted(self._feature_maps, key=self._feature_map_sort_key)
+                    for feature in self._feature_maps[mapname])
 
         # Write status message
         msg = 'All is well' if self._all_well else 'Problems detected'
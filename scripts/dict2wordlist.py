@@ -6,10 +6,12 @@ e.g. 'en' for 'English' or 'ja' for 'Japanese'. English is the default.
 """
 
 from __future__ import annotations
-from collections import defaultdict
 from dataclasses import dataclass, field
 from datetime import date
-from typing import Dict, List, Optional, TextIO
+from functools import lru_cache
+from itertools import groupby
+import re
+from typing import List, Optional, TextIO, Tuple
 from warnings import warn
 
 from linedict import LineDict
@@ -29,6 +31,13 @@ OUTFILE = 'wordlist-(LANG).txt'
 GROUP_ORDER = tuple('noun name adj adv verb particle det pron num prep prep_phrase conj prefix '
                     'suffix intj phrase'.split())
 
+# The position of each class in the group order
+GROUP_INDEX = {cls: idx for idx, cls in enumerate(GROUP_ORDER)}
+
+# Values written as fractions ("x/y") or in power notation ("x^y")
+FRACTION_OR_POWER_RE = re.compile(
+    r'\s*(?:(?P<num>\d+)\s*/\s*(?P<denom>\d+)|(?P<base>[-+]?\d+)\s*\^\s*(?P<exp>[-+]?\d+))\s*$')
+
 # A few word classes are replaced with shorter names when showing them in word class lists
 SHORT_CLASS_NAMES = {
     'name': 'PN',
@@ -40,9 +49,26 @@ SHORT_CLASS_NAMES = {
 }
 
 
+##### Helper functions #####
+
+@lru_cache(maxsize=None)
+def format_class(cls: str) -> str:
+    """Return the capitalized (and possibly shortened) name shown for 'cls' in class lists."""
+    return util.capitalize(SHORT_CLASS_NAMES.get(cls, cls))
+
+
+def group_key(word_info: WordInfo) -> Tuple[int, str]:
+    """Return the key used to group words by their first class.
+
+    Classes are sorted in group order, followed by any left-over classes sorted by name.
+    """
+    cls = word_info.classes[0]
+    return (GROUP_INDEX.get(cls, len(GROUP_ORDER)), cls)
+
+
 ##### Types #####
 
-@dataclass
+@dataclass(slots=True)
 class WordInfo():
     """The information about a word we want to serialize."""
     classes: List[str] = field(default_factory=list)
@@ -68,15 +94,14 @@ class WordInfo():
         raw = entry.get('value')
         if not raw:
             return None
-        if '/' in raw:
-            # It's a fraction
-            num, denom = raw.split('/', 1)
-            raw = f'{denom.strip()}.{num.strip()}'
+        match = FRACTION_OR_POWER_RE.match(raw)
+        if match:
+            if match['denom']:
+                # It's a fraction
+                return float(f"{match['denom']}.{match['num']}")
+            # Power notation
+            return pow(int(match['base']), int(match['exp']))
         try:
-            if '^' in raw:
-                # Power notation
-                base, exp = raw.split('^', 1)
-                return pow(int(base), int(exp))
             return float(raw)
         except ValueError:
             warn(f'Value "{raw}" is not a number')
@@ -103,9 +128,7 @@ class WordInfo():
         class_info = ''
         if len(self.classes) > 1:
             # The list of classes is only printed if the word belongs to several ones
-            formatted_classes = [util.capitalize(SHORT_CLASS_NAMES.get(cls, cls))
-                                 for cls in self.classes]
-            class_info = ' <sup>' + '/'.join(formatted_classes) + '</sup>'
+            class_info = ' <sup>' + '/'.join(map(format_class, self.classes)) + '</sup>'
 
         if self.gloss and ('+' in self.gloss or self.gloss.startswith('=')):
             gloss_info = f' ({self.gloss})'
@@ -154,10 +177,9 @@ class WordlistMaker:
                                 word.numvalue if word.numvalue is not None else infinity)
 
         trans_cls = self.value_provider.lookup(cls)
-        print(f'\n===== {trans_cls} =====\n', file=outfile)
-
-        for word_info in word_infos:
-            print(word_info, file=outfile)
+        lines = [f'\n===== {trans_cls} =====\n']
+        lines.extend(str(word_info) for word_info in word_infos)
+        outfile.write('\n'.join(lines) + '\n')
 
     def create_wordlist(self) -> None:
         """Create and print the wordlist, adding translations in the requested language.
@@ -166,25 +188,17 @@ class WordlistMaker:
         outfilename = OUTFILE.replace('(LANG)', self.lang)
         with open(outfilename, 'w', encoding='utf8') as outfile:
             self.print_header(outfile)
-            # Read and convert entries
+            # Read and convert entries, sorting them by the group order of their first class
+            # (left-over classes come last, sorted by name) -- since sorting is stable, words
+            # within a group keep their dictionary order
             entries = linedict.read_dicts_from_file(DICT_FILE)
-            class_dict: Dict[str, List[WordInfo]] = defaultdict(list)
-
-            for entry in entries:
-                word_info = WordInfo.from_entry(entry, self.lang)
-                # Group words by first class
-                class_dict[word_info.classes[0]].append(word_info)
-
-            # Iterate word classes in group order
-            for cls in GROUP_ORDER:
-                word_infos = class_dict.pop(cls, [])
-                if word_infos:
-                    self.print_group(outfile, cls, word_infos)
-
-            # Print any left-over classes, with a warning
-            for cls, word_infos in sorted(class_dict.items()):
-                warn(f'Unexpected word class: {cls}')
-                self.print_group(outfile, cls, word_infos)
+            word_infos = sorted((WordInfo.from_entry(entry, self.lang) for entry in entries),
+                                key=group_key)
+
+            for (group_idx, cls), group in groupby(word_infos, key=group_key):
+                if group_idx == len(GROUP_ORDER):
+                    warn(f'Unexpected word class: {cls}')
+                self.print_group(outfile, cls, list(group))
             # XXX Tags are ignored for now, but should be added and used in a later version
 
 
@@ -1,15 +1,25 @@
 """ LineDict and related types and functions. """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Iterator, Mapping, MutableMapping, Optional, Sequence
+import sys
+from typing import Dict, Iterator, List, Mapping, MutableMapping, Optional, Sequence
+from typing import ItemsView, KeysView, Union, ValuesView, overload
 from warnings import warn
 
 import util
+from util import T
+
+
+# States of the parser in dict_from_str, telling what kind of line preceded the current one
+STATE_INITIAL = 0        # none (start of the dictionary)
+STATE_AFTER_KEY = 1      # a key/value pair
+STATE_AFTER_SKIPPED = 2  # a comment, empty line, or line with an empty key
 
 
 class ToStringDict(ABC):
     """Interface for objects that can be converted into a dictionary of string/string pairs."""
     # pylint: disable=too-few-public-methods
+    __slots__ = ()
 
     @abstractmethod
     def to_dict(self) -> Mapping[str, str]:
@@ -31,6 +41,8 @@ class LineDict(MutableMapping[str, str], ToStringDict):
     The get the line number of the first key/value pair, call first_lineno().
     """
 
+    __slots__ = ('filename', '_store', '_first_lineno', '_lines')
+
     def __init__(self, filename: Optional[str] = None) -> None:
         """Create a new instance.
 
@@ -39,7 +51,7 @@ class LineDict(MutableMapping[str, str], ToStringDict):
         """
         self.filename = filename
         self._store: Dict[str, str] = {}
-        self._first_lineno: Optional[int] = None
+        self._first_lineno = -1
         self._lines: Dict[str, int] = {}
 
     def errprefix(self, lineno: int = -1) -> str:
@@ -66,6 +78,41 @@ class LineDict(MutableMapping[str, str], ToStringDict):
         """Return the number of key/value pairs in this dictionary."""
         return len(self._store)
 
+    # The following methods are inherited from Mapping, but forwarding them to the underlying
+    # dict avoids the generic implementations which go through the methods above
+
+    def __contains__(self, key: object) -> bool:
+        """Return True if the key is in this dictionary."""
+        return key in self._store
+
+    @overload
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    @overload
+    def get(self, key: str, default: str) -> str:
+        ...
+
+    @overload
+    def get(self, key: str, default: T) -> Union[str, T]:
+        ...
+
+    def get(self, key: str, default: Union[str, T, None] = None) -> Union[str, T, None]:
+        """Return the value for a key if it is in this dictionary, else 'default'."""
+        return self._store.get(key, default)
+
+    def keys(self) -> KeysView[str]:
+        """Return a view of the keys in this dictionary."""
+        return self._store.keys()
+
+    def values(self) -> ValuesView[str]:
+        """Return a view of the values in this dictionary."""
+        return self._store.values()
+
+    def items(self) -> ItemsView[str, str]:
+        """Return a view of the key/value pairs in this dictionary."""
+        return self._store.items()
+
     def add(self, key: str, value: str, lineno: int = -1, allow_replace: bool = False) -> None:
         """Add a key/value pair to the dictionary.
 
@@ -76,12 +123,16 @@ class LineDict(MutableMapping[str, str], ToStringDict):
         Note that subsequent calls will not override this value, even if they come with a
         smaller 'lineno' value.
         """
-        if key in self._store and not allow_replace:
+        # A duplicate key is detected by the store not growing, which saves a separate lookup
+        store = self._store
+        size = len(store)
+        store[key] = value
+        if len(store) == size and not allow_replace:
             warn(f'{self.errprefix(lineno)}Duplicate key "{key}"')
-        self._store[key] = value
-        self._lines[key] = lineno
-        if self._first_lineno is None:
+        # Line numbers are never removed, so an empty '_lines' means this is the first call
+        if not self._lines:
             self._first_lineno = lineno
+        self._lines[key] = lineno
 
     def append_to_val(self, key: str, append_text: str) -> None:
         """Appends 'append_text' at the end of the value stored for 'key'.
@@ -96,7 +147,7 @@ class LineDict(MutableMapping[str, str], ToStringDict):
         Note that it's necessary to call 'add' instead to properly set a line number.
         If called like this, the 'first_lineno' will be re-used for the new entry.
         """
-        self.add(key, item, util.coalesce(self._first_lineno, -1))
+        self.add(key, item, self._first_lineno)
 
     def __delitem__(self, key):
         """Delete the specified key. Raises a KeyError if *key* is not in the map."""
@@ -107,14 +158,14 @@ class LineDict(MutableMapping[str, str], ToStringDict):
 
         Returns -1 if the dictionary is empty.
         """
-        return util.coalesce(self._first_lineno, -1)  # type: ignore
+        return self._first_lineno
 
     def lineno(self, key: str) -> int:
         """Return the line number associated with the key.
 
         Returns -1 if the key is unknown.
         """
-        return util.coalesce(self._lines.get(key), -1)  # type: ignore
+        return self._lines.get(key, -1)
 
     def to_dict(self) -> MutableMapping[str, str]:
         """Return this dictionary itself."""
@@ -165,7 +216,11 @@ def dict_from_str(entry: str, firstline: int = 1, filename: Optional[str] = None
     lines = entry.splitlines()
     lineno = firstline - 1
     result = LineDict(filename)
-    last_key_added = None  # None: initial value, '': last line was comment or empty
+    state = STATE_INITIAL
+    last_key_added = ''
+    # Continuation lines are collected and appended to the value of 'last_key_added' together,
+    # rather than extending the value string one line at a time
+    continuation_lines: List[str] = []
 
     for line in lines:
         lineno += 1
@@ -173,11 +228,10 @@ def dict_from_str(entry: str, firstline: int = 1, filename: Optional[str] = None
 
         if line.startswith('  '):
             # Continuation line
-            if last_key_added:
-                value = line[2:]
-                result.append_to_val(last_key_added, '\n' + value)
+            if state == STATE_AFTER_KEY:
+                continuation_lines.append(line[2:])
             else:
-                if last_key_added == '':
+                if state == STATE_AFTER_SKIPPED:
                     error_cond = 'after a comment or empty line'
                 else:
                     error_cond = 'at the start of a dictionary'
@@ -185,32 +239,49 @@ def dict_from_str(entry: str, firstline: int = 1, filename: Optional[str] = None
                      f'"{line.strip()}"')
             continue
 
-        if not line or line.lstrip().startswith('#'):
-            # Skip empty and comment lines – the former trigger a warning
-            if not line:
-                warn(f'{result.errprefix(lineno)}Line is empty')
-            last_key_added = ''
+        if continuation_lines:
+            result.append_to_val(last_key_added, '\n' + '\n'.join(continuation_lines))
+            continuation_lines.clear()
+
+        # Skip empty and comment lines – the former trigger a warning. Leading whitespace is
+        # only stripped (once) if the line starts with it
+        if not line:
+            warn(f'{result.errprefix(lineno)}Line is empty')
+            state = STATE_AFTER_SKIPPED
+            continue
+        if line[0].isspace():
+            stripped_line = line.lstrip()
+            if stripped_line[0] == '#':
+                state = STATE_AFTER_SKIPPED
+                continue
+            if line[0] in (' ', '\t'):
+                warn(f'{result.errprefix(lineno)}Invalid leading whitespace: "{line}"')
+                line = stripped_line
+        elif line[0] == '#':
+            state = STATE_AFTER_SKIPPED
             continue
-        if line[0] in (' ', '\t'):
-            warn(f'{result.errprefix(lineno)}Invalid leading whitespace: "{line}"')
-            line = line.lstrip()
 
-        parts = line.split(':', 1)
+        colon_pos = line.find(':')
 
-        if len(parts) < 2:
+        if colon_pos < 0:
             warn(f'{result.errprefix(lineno)}No valid key/value pair found: "{line}"')
             continue
 
-        key = parts[0].strip()
-        value = parts[1].strip()
-        last_key_added = key
-
+        key = line[:colon_pos].strip()
+        value = line[colon_pos + 1:].strip()
         if not key:
             warn(f'{result.errprefix(lineno)}Ignoring invalid empty key: "{line}"')
+            state = STATE_AFTER_SKIPPED
             continue
 
-        result.add(key, value, lineno)
+        state = STATE_AFTER_KEY
+        last_key_added = key
+
+        # The same few keys recur in every dict of a file, hence they are interned
+        result.add(sys.intern(key), value, lineno)
 
+    if continuation_lines:
+        result.append_to_val(last_key_added, '\n' + '\n'.join(continuation_lines))
     return result
 
 
@@ -222,16 +293,26 @@ def read_dicts_from_file(filename: str) -> Sequence[LineDict]:
     """
     lineno = 1
     result = []
+    entry_lines: List[str] = []
+
+    # The file is read line by line, keeping only the lines of the current entry in memory.
+    # Lines are only split at '\n', hence only a line consisting of just '\n' can separate
+    # two entries
+    with open(filename, newline='\n', encoding='utf8') as infile:
+        for line in infile:
+            if line == '\n' and entry_lines:
+                # The line break ending the preceding line is part of the separator as well
+                entry = dict_from_str(''.join(entry_lines)[:-1], lineno, filename)
+                if entry:
+                    result.append(entry)
+                lineno += len(entry_lines) + 1
+                entry_lines.clear()
+            else:
+                entry_lines.append(line)
 
-    with open(filename, newline='', encoding='utf8') as infile:
-        # Split into entries (separated by empty lines)
-        entries = infile.read().split('\n\n')
-
-        for entrystr in entries:
-            entry = dict_from_str(entrystr, lineno, filename)
-            if entry:
-                result.append(entry)
-            lineno += entrystr.count('\n') + 2
+    entry = dict_from_str(''.join(entry_lines), lineno, filename)
+    if entry:
+        result.append(entry)
 
     # If the last element is empty, we remove it altogether (this will happen esp. in case of
     # empty files)
@@ -257,14 +338,8 @@ def dump_dicts(dict_objects: Sequence[ToStringDict], filename: str) -> None:
     separated by an empty line. Keys are serialized in the order they have in the
     dict.  All whitespace in keys and values is normalized.
     """
-    first = True
     with open(filename, 'w', encoding='utf8') as outfile:
-        for obj in dict_objects:
-            if first:
-                first = False
-            else:
-                outfile.write('\n')
-            outfile.write(stringify_dict(obj))
+        outfile.write('\n'.join(map(stringify_dict, dict_objects)))
 
 
 def stringify_dict(dict_object: ToStringDict) -> str:
@@ -275,9 +350,5 @@ def stringify_dict(dict_object: ToStringDict) -> str:
     normalized.
     """
     dct = dict_object.to_dict()
-    result = ''
-    for key, value in dct.items():
-        norm_key = util.normalize(key)
-        norm_value = util.normalize(value)
-        result += f'{norm_key}: {norm_value}\n'
-    return result
+    return ''.join(f'{util.normalize(key)}: {util.normalize(value)}\n'
+                   for key, value in dct.items())
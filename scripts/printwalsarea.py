@@ -14,7 +14,7 @@ import walsfeaturefreq
 
 ##### Dataclass #####
 
-@dataclass(eq=True)
+@dataclass(eq=True, slots=True)
 class FeatureValue:
     """Represents a feature values with its occurrences in our source languages."""
 
@@ -53,11 +53,12 @@ class FeatureValue:
 
         feature, value, name, languages, lang_count, frequency = data
 
+        # Feature IDs and language codes recur in many rows, hence we intern them
         return cls(
-            feature=feature,
+            feature=sys.intern(feature),
             value=int(value),
             name=name,
-            languages=[lang.strip() for lang in languages.split(',')],
+            languages=[sys.intern(lang.strip()) for lang in languages.split(',')],
             language_count=int(lang_count),
             relative_frequency=int(frequency.rstrip('%'))
         )
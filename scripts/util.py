@@ -3,13 +3,14 @@
 import csv
 from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
 import logging
 import os
 from os import path
 import re
 from shutil import copyfile
 import sys
-from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
 import unicodedata
 from warnings import warn
 
@@ -37,6 +38,12 @@ COMMON_AUXLANGS = frozenset('eo ia io'.split())
 # The auxlangs we use by default to draw our own candidates from
 DEFAULT_AUXLANGS = frozenset('globasa glosa lidepla'.split())
 
+# Text in square brackets (e.g. IPA or romanizations), including any preceding whitespace
+BRACKETED_TEXT_RE = re.compile(r'\s*\[.*?\]')
+
+# Text in parentheses, including any preceding whitespace
+PARENTHESIZED_TEXT_RE = re.compile(r'\s*\([^)]*\)')
+
 # Configure logging – generally show debug messages, but suppress them for some modules
 logging.basicConfig(level=logging.DEBUG)
 logging.getLogger('urllib3.connectionpool').setLevel(logging.WARNING)
@@ -149,6 +156,22 @@ def open_csv_writer(filename: str, create_backup: bool = True) -> Iterator[Any]:
         yield writer
 
 
+def write_csv_rows_atomically(rows: Iterable[Sequence[str]], filename: str) -> None:
+    """Write all rows to a CSV file, atomically replacing its previous contents.
+
+    The rows are first written to a temporary file (with '.tmp' appended to its name) which
+    then replaces the original file. Hence, if the process is interrupted, the file will have
+    either its old or its new contents, but it will never be left half-written.
+    """
+    tmpname = filename + '.tmp'
+    with open(tmpname, mode='w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerows(rows)
+        csvfile.flush()
+        os.fsync(csvfile.fileno())
+    os.replace(tmpname, filename)
+
+
 ##### Data-related utility functions #####
 
 def coalesce(*args: Optional[T]) -> Optional[T]:
@@ -240,6 +263,23 @@ def copy_to_backup(currentname: str) -> None:
         copyfile(currentname, currentname + '.bak')
 
 
+def copy_to_backup_and_read(currentname: str) -> str:
+    """Create a backup copy of a file (see 'copy_to_backup') and return its contents.
+
+    The file is read only once, so callers that need its contents anyway don't have to open
+    it a second time. Line endings are preserved as is.
+
+    If the file doesn't exist, this function does nothing and returns an empty string.
+    """
+    if not path.exists(currentname):
+        return ''
+    with open(currentname, newline='', encoding='utf-8') as infile:
+        text = infile.read()
+    with open(currentname + '.bak', 'w', newline='', encoding='utf-8') as outfile:
+        outfile.write(text)
+    return text
+
+
 def dump_file(text: str, filename: str) -> None:
     """Store 'text' in a file called 'filename'."""
     with open(filename, 'w', encoding='utf-8') as outfile:
@@ -284,19 +324,23 @@ def capitalize(text: str) -> str:
     return text
 
 
+@lru_cache(maxsize=65536)
 def eliminate_parens(text: str) -> str:
     """Eliminate those parts of a text written in parentheses."""
-    return re.sub(r'\s*\([^)]*\)', '', text).strip()
+    return PARENTHESIZED_TEXT_RE.sub('', text).strip()
 
 
+@lru_cache(maxsize=65536)
 def discard_text_in_brackets(text: str) -> str:
     """
     Remove all text contained within square brackets and any whitespace preceding them.
 
     Returns the input string with all bracketed text and preceding whitespace removed.
     If if those contain any square brackets, the original string is returned unchanged.
+
+    Results are cached since the same translations tend to be checked repeatedly.
     """
-    return re.sub(r'\s*\[.*?\]', '', text)
+    return BRACKETED_TEXT_RE.sub('', text)
 
 
 def extract_text_in_brackets(text: str, otherwise_return_fully: bool = True) -> Optional[str]:
@@ -363,7 +407,18 @@ def normalize(text: str) -> str:
     Any leading or trailing whitespace is discarded; each internal whitespace sequence
     is replaced by a single space.
     """
-    return ' '.join(text.strip().split())
+    return ' '.join(text.split())
+
+
+@lru_cache(maxsize=None)
+def sep_regexes(actual_sep: str) -> Tuple[re.Pattern[str], re.Pattern[str]]:
+    """Return the compiled regexes used by 'split_on_sep' for a separator.
+
+    'actual_sep' must not contain any outer whitespace. The first regex matches the separator
+    within parentheses, the second matches it together with any surrounding whitespace.
+    """
+    escaped_sep = re.escape(actual_sep)
+    return re.compile(rf'\([^)]*{escaped_sep}[^)]*\)'), re.compile(rf'\s*{escaped_sep}\s*')
 
 
 def split_on_sep(text: Optional[str], sep: str) -> List[str]:
@@ -382,11 +437,23 @@ def split_on_sep(text: Optional[str], sep: str) -> List[str]:
     """
     if not text:
         return []
+    # Callers may modify the returned list, hence the cached tuple is copied
+    return list(split_nonempty_text_on_sep(text, sep))
+
+
+@lru_cache(maxsize=65536)
+def split_nonempty_text_on_sep(text: str, sep: str) -> Tuple[str, ...]:
+    """Split a non-empty string into parts separated by 'sep', as described in 'split_on_sep'.
+
+    Results are cached since the same fields tend to be split repeatedly.
+    """
     text = text.strip()
     actual_sep = sep.strip()
-    sep_in_parens = rf'\([^)]*{re.escape(actual_sep)}[^)]*\)'
-    need_to_handle_parens = bool(re.search(sep_in_parens, text))
-    result = re.split(rf'\s*{re.escape(actual_sep)}\s*', text)
+    if actual_sep not in text:
+        return (text,)
+    sep_in_parens_re, sep_re = sep_regexes(actual_sep)
+    need_to_handle_parens = bool(sep_in_parens_re.search(text))
+    result = sep_re.split(text)
 
     if need_to_handle_parens:
         # Remerge elements if the separator occurs within parentheses
@@ -402,9 +469,9 @@ def split_on_sep(text: Optional[str], sep: str) -> List[str]:
                 if '(' in elem and ')' not in elem:
                     wait_for_end = True
                 merged_result.append(elem)
-        return merged_result
+        return tuple(merged_result)
 
-    return result
+    return tuple(result)
 
 
 def split_on_commas(text: Optional[str]) -> List[str]: